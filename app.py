@@ -4,14 +4,19 @@
 # Import necessary modules
 import os  # For file and directory operations
 import configparser  # For reading configuration files
+import functools  # For caching filter results
+import hashlib  # For building cache keys from source file metadata
+import math  # For page count calculations
+import numpy as np  # For numerical operations
 import pandas as pd  # For data manipulation and analysis
+from python_calamine import CalamineWorkbook  # For fast (Rust-based) Excel parsing
 import dash  # For building web applications
 from dash import dcc, html  # Dash core components and HTML elements
 from dash.dependencies import Input, Output, State  # For callbacks and interactions
 import dash_table  # For creating interactive data tables
 import dash_bootstrap_components as dbc  # For using Bootstrap components in Dash
+from waitress import serve  # For serving the app with a production WSGI server
 import re  # For regular expression matching
-import threading  # For running the app in a separate thread
 
 # Read configuration file to get application settings
 config = configparser.ConfigParser()
@@ -19,8 +24,13 @@ config.read('config.ini')  # Load configuration file
 
 # Extract the downloads path and file patterns from the configuration
 downloads_path = config.get('Paths', 'downloads_path').strip('"')
+cache_path = config.get('Paths', 'cache_path', fallback='cache').strip('"')
 file1_pattern = config.get('Patterns', 'file1_pattern').strip('"')
-file2_pattern = config.get('Patterns', 'file2_pattern').strip('"')
+
+# Extract the server settings from the configuration
+server_host = config.get('Server', 'host', fallback='127.0.0.1')
+server_port = config.getint('Server', 'port', fallback=8050)
+server_threads = config.getint('Server', 'threads', fallback=8)
 
 # Check if the specified downloads path exists
 if not os.path.exists(downloads_path):
@@ -28,81 +38,172 @@ if not os.path.exists(downloads_path):
 
 # Function to find the latest file matching a specific pattern in the downloads path
 def get_latest_file(pattern):
-    # List all files in the downloads path
-    files = os.listdir(downloads_path)
-    # Filter files that match the given pattern
-    matched_files = [f for f in files if re.match(pattern, f)]
-    if matched_files:
-        # Find the most recently created file
-        latest_file = max(matched_files, key=lambda f: os.path.getctime(os.path.join(downloads_path, f)))
-        return os.path.join(downloads_path, latest_file)
-    raise FileNotFoundError("No files matching the pattern were found.")
+    regex = re.compile(pattern)  # Compile once rather than per file name
+    latest_file, latest_time = None, None
+    # scandir entries carry their stat data, avoiding a separate stat call per file on most platforms
+    with os.scandir(downloads_path) as entries:
+        for entry in entries:
+            # Match the whole name so partial downloads such as '.xlsx.crdownload' are ignored
+            if regex.fullmatch(entry.name):
+                # Keep the most recently created file
+                created = entry.stat().st_ctime
+                if latest_time is None or created > latest_time:
+                    latest_file, latest_time = entry.path, created
+    if latest_file is None:
+        raise FileNotFoundError(f"No files matching the pattern were found: {pattern}")
+    return latest_file
 
-# Attempt to get the latest files matching the patterns
+# Attempt to get the latest file matching the pattern
 try:
     file1_path = get_latest_file(file1_pattern)
-    file2_path = get_latest_file(file2_pattern)
 except FileNotFoundError as e:
     print(e)
 
+# Cell text treated as missing, matching the default NA values of pd.read_excel
+EXCEL_NA_VALUES = {
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'n/a', 'nan', 'null'
+}
+
+# Function to convert a calamine cell value the way pd.read_excel does
+def convert_cell(value):
+    if isinstance(value, str) and value in EXCEL_NA_VALUES:
+        return None  # Blank cells and NA text are missing
+    if isinstance(value, float) and value.is_integer():
+        return int(value)  # Calamine returns every number as a float; keep whole numbers as ints
+    return value
+
+# Function to read selected columns from the first sheet of an Excel file
+# Calamine parses the whole sheet in native code
+def read_excel_columns(file_path, first_row, columns):
+    workbook = CalamineWorkbook.from_path(file_path)
+    try:
+        # Keep leading empty rows/columns so row and column positions stay absolute
+        rows = workbook.get_sheet_by_index(0).to_python(skip_empty_area=False)
+    finally:
+        workbook.close()  # Release the underlying file handle
+    data = [
+        tuple(convert_cell(row[index]) if index < len(row) else None for index in columns)
+        for row in rows[first_row - 1:]
+    ]
+    return pd.DataFrame(data, columns=list(columns.values()))
+
 # Function to clean and preprocess the first dataset
 def data1_clean(file1_path):
-    df = pd.read_excel(file1_path, skiprows=5)  # Load Excel file and skip header rows
-    df = df.rename(columns={  # Rename relevant columns
-        'Unnamed: 0': 'Sl.no',
-        'Unnamed: 1': 'IP Address',
-        'Unnamed: 4': 'Event',
-        'Unnamed: 6': 'Alarm Time',
-        'Unnamed: 2': 'Node Alias'  
+    # Load only the needed columns, skipping the five header rows and the column title row
+    df = read_excel_columns(file1_path, first_row=7, columns={
+        1: 'IP Address',
+        2: 'Node Alias',
+        4: 'Event',
+        6: 'Alarm Time'
     })
-    # Drop unnecessary columns
-    df = df.drop(columns=['Sl.no', 'Clear Time', 'Duration', 'Description', 'Host Name'], errors='ignore')
-    df = df.dropna(subset=['Node Alias', 'Alarm Time'])  # Drop rows with missing essential data
-    df['Alarm Time'] = pd.to_datetime(df['Alarm Time'], errors='coerce')  # Convert alarm time to datetime
-    df = df.dropna(subset=['Alarm Time'])  # Remove invalid datetime rows
+    df['Alarm Time'] = pd.to_datetime(df['Alarm Time'], errors='coerce')  # Convert alarm time to datetime (invalid values become NaT)
+    df = df.dropna(subset=['Node Alias', 'Alarm Time'])  # Drop rows with missing essential data or invalid datetimes
+    df['Node Alias'] = df['Node Alias'].astype('category')  # Group and filter on integer codes
     return df
 
-# Function to clean and preprocess the second dataset
-def data2_clean(file2_path):
-    df = pd.read_excel(file2_path)  # Load Excel file
-    df = df.drop([0, 1, 2, 3, 4], axis=0).reset_index(drop=True)  # Remove unwanted header rows
-    # Drop unnecessary columns
-    df = df.drop(columns=['Unnamed: 2', 'Unnamed: 3'], errors='ignore')
-    # Rename columns for clarity
-    df = df.rename(columns={
-        'Unnamed: 0': 'Node Alias',
-        'Unnamed: 1': 'IP Address',
-        'Unnamed: 4': 'Availability',
-        'Unnamed: 5': 'Latency(msec)',
-        'Unnamed: 6': 'Packet Loss(%)'
-    })
-    # Convert relevant columns to numeric and handle errors
-    df['Packet Loss(%)'] = pd.to_numeric(df['Packet Loss(%)'], errors='coerce')
-    df['Availability'] = pd.to_numeric(df['Availability'], errors='coerce')
-    df['Latency(msec)'] = pd.to_numeric(df['Latency(msec)'], errors='coerce')
-    df = df.dropna(subset=['Packet Loss(%)', 'Availability', 'Latency(msec)'])  # Drop rows with missing data
+# Bump when the cleaning functions change so stale cached snapshots are not reused
+# (the pandas version is part of the key too, since pickled snapshots may not load across versions)
+CACHE_VERSION = 4
+
+# Function to load a cleaned dataset, reusing a cached snapshot while the source file is unchanged
+def load_cleaned(file_path, clean_func):
+    stat = os.stat(file_path)
+    key = hashlib.sha1(
+        f"{CACHE_VERSION}|{pd.__version__}|{file_path}|{stat.st_mtime_ns}|{stat.st_size}".encode()
+    ).hexdigest()
+    prefix = f"{clean_func.__name__}-"
+    cache_file = os.path.join(cache_path, f"{prefix}{key}.pkl")
+    if os.path.exists(cache_file):
+        try:
+            return pd.read_pickle(cache_file)  # Cache hit: skip Excel parsing entirely
+        except Exception as e:
+            print(f"Ignoring unreadable cache snapshot {cache_file}: {e}")  # Fall back to re-parsing
+    df = clean_func(file_path)
+    os.makedirs(cache_path, exist_ok=True)
+    # Remove snapshots of older source files for this dataset
+    for entry in os.listdir(cache_path):
+        if entry.startswith(prefix):
+            os.remove(os.path.join(cache_path, entry))
+    # Write to a temporary file first so an interrupted run never leaves a partial snapshot
+    df.to_pickle(cache_file + '.tmp')
+    os.replace(cache_file + '.tmp', cache_file)
     return df
 
-# Clean and preprocess the datasets
-df1_cleaned = data1_clean(file1_path)
-df2_cleaned = data2_clean(file2_path)
+# Clean and preprocess the event dataset (the only one the report is built from)
+df1_cleaned = load_cleaned(file1_path, data1_clean)
 
-# Merge the cleaned datasets on the 'IP Address' column
-merged_df = pd.merge(df1_cleaned, df2_cleaned[['IP Address', 'Availability']], on='IP Address', how='left')
+# Function to calculate downtime count per node (number of distinct alarm times)
+def count_downtime(alarms_df):
+    # Categorical value_counts is a single bincount over the alias codes, already in (alphabetical) category order
+    counts = alarms_df.drop_duplicates(['Node Alias', 'Alarm Time'])['Node Alias'].value_counts(sort=False)
+    counts_df = (
+        counts[counts > 0]  # Skip nodes with no alarms in the given rows
+        .rename_axis('Node Alias')
+        .reset_index(name='Downtime Count')
+    )
+    # Counts are small positive integers, so store them in the narrowest unsigned type
+    counts_df['Downtime Count'] = pd.to_numeric(counts_df['Downtime Count'], downcast='unsigned')
+    return counts_df
 
-# Calculate downtime count per node
-downtime_count = (
-    merged_df.groupby('Node Alias')['Alarm Time']
-    .nunique()
-    .reset_index(name='Downtime Count')
-)
+# Function to bucket downtime counts: 0 -> 1-3, 1 -> 4-5, 2 -> 6-10, 3 -> more than 10
+def bucket_downtime(counts_df):
+    return pd.cut(
+        counts_df['Downtime Count'], bins=[-np.inf, 3, 5, 10, np.inf], labels=False
+    ).astype('int8')
+
+# Range of bucket codes matched by each dropdown option ('>5' spans the two upper buckets)
+downtime_bucket_ranges = {
+    '1-3': (0, 0),
+    '4-5': (1, 1),
+    '>5': (2, 3),
+    '>10': (3, 3)
+}
+
+# Function to convert a DataFrame into DataTable records
+# Building the dicts from natively boxed row lists avoids the per-cell boxing done by to_dict('records')
+def to_records(df):
+    columns = list(df.columns)
+    return [dict(zip(columns, row)) for row in df.to_numpy(dtype=object).tolist()]
+
+# Function to select the table records matching a downtime option
+def select_downtime(counts_df, buckets, downtime_value):
+    if downtime_value in downtime_bucket_ranges:
+        low, high = downtime_bucket_ranges[downtime_value]
+        counts_df = counts_df[buckets.between(low, high)]
+    return to_records(counts_df)
+
+# Calculate downtime count per node over the full date range and bucket it once
+downtime_count = count_downtime(df1_cleaned)
+downtime_bucket = bucket_downtime(downtime_count)
+
+# Precompute the table records for every dropdown option over the full date range
+all_downtime_records = to_records(downtime_count)
+downtime_records = {
+    downtime_value: select_downtime(downtime_count, downtime_bucket, downtime_value)
+    for downtime_value in downtime_bucket_ranges
+}
+
+# Function to get the table records for a downtime option and date range (repeat requests are served from cache)
+@functools.lru_cache(maxsize=128)
+def get_filtered_records(downtime_value, start_date, end_date):
+    if not (start_date and end_date):
+        return downtime_records.get(downtime_value, all_downtime_records)
+    # Recount downtime using only the alarms raised within the selected dates (end date inclusive)
+    alarm_time = df1_cleaned['Alarm Time']
+    in_range = (
+        (alarm_time >= pd.to_datetime(start_date)) &
+        (alarm_time < pd.to_datetime(end_date) + pd.Timedelta(days=1))
+    )
+    counts_df = count_downtime(df1_cleaned[in_range])
+    return select_downtime(counts_df, bucket_downtime(counts_df), downtime_value)
 
 # Initialize the Dash app
 app = dash.Dash(__name__, external_stylesheets=[dbc.themes.CYBORG])
 
 # Define date range boundaries for the date picker
-min_date = merged_df['Alarm Time'].min()
-max_date = merged_df['Alarm Time'].max()
+min_date = df1_cleaned['Alarm Time'].min()
+max_date = df1_cleaned['Alarm Time'].max()
 
 # Handle cases where dates are missing
 if pd.isnull(min_date):
@@ -127,8 +228,8 @@ custom_dropdown_style = {
     "boxShadow": "0 4px 8px rgba(0, 0, 0, 0.1)"  # Slight shadow effect
 }
 
-# Create downtime count options for the dropdown
-downtime_options = [{'label': str(count), 'value': count} for count in downtime_count['Downtime Count'].unique()]
+# Number of rows sent to the data table per page
+table_page_size = 10
 
 # Define the app layout
 app.layout = dbc.Container(
@@ -139,6 +240,8 @@ app.layout = dbc.Container(
         "padding": "20px"  # Padding for spacing
     },
     children=[
+        # Filters applied with the button, so paging does not pick up unapplied changes
+        dcc.Store(id='applied-filters', data=None),
         # Header section
         dbc.Row(
             dbc.Col(
@@ -213,8 +316,11 @@ app.layout = dbc.Container(
                             dash_table.DataTable(
                                 id='filtered-table',
                                 columns=[{"name": col, "id": col} for col in downtime_count.columns],
-                                data=downtime_count.to_dict('records'),  # Set initial table data
-                                page_size=10,
+                                data=all_downtime_records[:table_page_size],  # Set initial table page
+                                page_action='custom',  # Paginate on the server, sending one page per request
+                                page_current=0,
+                                page_size=table_page_size,
+                                page_count=max(1, math.ceil(len(all_downtime_records) / table_page_size)),
                                 style_table={
                                     'overflowX': 'auto',
                                     'border': '1px solid #ddd',
@@ -242,36 +348,42 @@ app.layout = dbc.Container(
     ]
 )
 
-# Define the callback to filter data based on selected date range and downtime count
+# Define the callback to filter data based on selected date range and downtime count and serve the current page
 @app.callback(
     Output('filtered-table', 'data'),
+    Output('filtered-table', 'page_count'),
+    Output('filtered-table', 'page_current'),
+    Output('applied-filters', 'data'),
     Input('filter-button', 'n_clicks'),
+    Input('filtered-table', 'page_current'),
+    Input('filtered-table', 'page_size'),
     State('date-range', 'start_date'),
     State('date-range', 'end_date'),
-    State('downtime-dropdown', 'value')
+    State('downtime-dropdown', 'value'),
+    State('applied-filters', 'data')
 )
-def filter_data(n_clicks, start_date, end_date, downtime_value):
-    if n_clicks is None:
-        return downtime_count.to_dict('records')  # Default display
-    # Filter data based on downtime count
-    filtered_df = downtime_count
-    if downtime_value == '1-3':
-        filtered_df = filtered_df[filtered_df['Downtime Count'] <= 3]
-    elif downtime_value == '4-5':
-        filtered_df = filtered_df[(filtered_df['Downtime Count'] > 3) & (filtered_df['Downtime Count'] <= 5)]
-    elif downtime_value == '>5':
-        filtered_df = filtered_df[filtered_df['Downtime Count'] > 5]
-    elif downtime_value == '>10':
-        filtered_df = filtered_df[filtered_df['Downtime Count'] > 10]
-
-    # If start and end dates are provided, filter based on alarm time
-    if start_date and end_date:
-        filtered_df = filtered_df[
-            (filtered_df['Alarm Time'] >= pd.to_datetime(start_date)) & 
-            (filtered_df['Alarm Time'] <= pd.to_datetime(end_date))
-        ]
-    return filtered_df.to_dict('records')
+def filter_data(n_clicks, page_current, page_size, start_date, end_date, downtime_value, applied_filters):
+    if dash.callback_context.triggered_id == 'filter-button':
+        # Apply the selected filters and return to the first page
+        applied_filters = {'downtime_value': downtime_value, 'start_date': start_date, 'end_date': end_date}
+        page_current = 0
+        stored_filters = applied_filters
+    else:
+        stored_filters = dash.no_update  # Paging keeps the filters that were last applied
+    if applied_filters is None:
+        records = all_downtime_records  # Default display
+    else:
+        records = get_filtered_records(
+            applied_filters['downtime_value'], applied_filters['start_date'], applied_filters['end_date']
+        )
+    page_count = max(1, math.ceil(len(records) / page_size))
+    page_current = min(page_current or 0, page_count - 1)  # Stay within the available pages
+    start = page_current * page_size
+    return records[start:start + page_size], page_count, page_current, stored_filters
 
-# Run the app in a separate thread for easy execution in a local environment
+# Run the app with Waitress (multi-threaded WSGI server); set DASH_DEBUG=true to use the Dash debug server instead
 if __name__ == '__main__':
-    threading.Thread(target=app.run_server, kwargs={"debug": True, "use_reloader": False}).start()
+    if os.environ.get('DASH_DEBUG', '').lower() in ('1', 'true'):
+        app.run_server(host=server_host, port=server_port, debug=True, use_reloader=False)
+    else:
+        serve(app.server, host=server_host, port=server_port, threads=server_threads)